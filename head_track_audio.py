@@ -1,24 +1,125 @@
+import ctypes
 import cv2
 import numpy as np
+import os
+import queue
 import time
 import subprocess
 import sys
+import tempfile
 import select
+import shutil
 from threading import Thread
 
 # Import macOS-specific modules
 from AppKit import NSSound, NSApplication, NSApp
 from Foundation import NSObject, NSLog
 
+# Numba is optional; without it the balance math simply runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+@njit(cache=True)
+def _calc_balance(face_x, center, inv_norm):
+    """Map a face x position to a -1 to 1 balance around the given center"""
+    # Convert to a -1 to 1 range; inv_norm is 1 / (center * sensitivity)
+    balance = (face_x - center) * inv_norm
+    
+    # Clamp the value to stay within -1 to 1
+    if balance < -1.0:
+        balance = -1.0
+    elif balance > 1.0:
+        balance = 1.0
+    
+    # Invert the balance since we want sound to be stronger on the side the user is on
+    return -balance
+
+def _fourcc(code):
+    """Pack a four-character CoreAudio selector like 'dOut' into its UInt32 value"""
+    return int.from_bytes(code.encode('ascii'), 'big')
+
+class AudioObjectPropertyAddress(ctypes.Structure):
+    _fields_ = [
+        ('mSelector', ctypes.c_uint32),
+        ('mScope', ctypes.c_uint32),
+        ('mElement', ctypes.c_uint32),
+    ]
+
+class CoreAudioBalance:
+    """Read and set the default output device's stereo pan directly through CoreAudio"""
+    SYSTEM_OBJECT = 1
+    DEFAULT_OUTPUT_DEVICE = _fourcc('dOut')
+    STEREO_PAN = _fourcc('span')
+    SCOPE_GLOBAL = _fourcc('glob')
+    SCOPE_OUTPUT = _fourcc('outp')
+    ELEMENT_MAIN = 0
+    
+    def __init__(self):
+        # Raises OSError when CoreAudio isn't available
+        self.lib = ctypes.CDLL('/System/Library/Frameworks/CoreAudio.framework/CoreAudio')
+        address_p = ctypes.POINTER(AudioObjectPropertyAddress)
+        self.lib.AudioObjectGetPropertyData.argtypes = [
+            ctypes.c_uint32, address_p, ctypes.c_uint32, ctypes.c_void_p,
+            ctypes.POINTER(ctypes.c_uint32), ctypes.c_void_p,
+        ]
+        self.lib.AudioObjectGetPropertyData.restype = ctypes.c_int32
+        self.lib.AudioObjectSetPropertyData.argtypes = [
+            ctypes.c_uint32, address_p, ctypes.c_uint32, ctypes.c_void_p,
+            ctypes.c_uint32, ctypes.c_void_p,
+        ]
+        self.lib.AudioObjectSetPropertyData.restype = ctypes.c_int32
+        
+        self.pan_address = AudioObjectPropertyAddress(self.STEREO_PAN, self.SCOPE_OUTPUT, self.ELEMENT_MAIN)
+        self.device_id = self.get_default_output_device()
+        
+    def get_default_output_device(self):
+        """Return the AudioObjectID of the default output device"""
+        address = AudioObjectPropertyAddress(self.DEFAULT_OUTPUT_DEVICE, self.SCOPE_GLOBAL, self.ELEMENT_MAIN)
+        device_id = ctypes.c_uint32(0)
+        size = ctypes.c_uint32(ctypes.sizeof(device_id))
+        status = self.lib.AudioObjectGetPropertyData(
+            self.SYSTEM_OBJECT, ctypes.byref(address), 0, None, ctypes.byref(size), ctypes.byref(device_id))
+        if status != 0:
+            raise OSError(f"CoreAudio error {status} getting the default output device")
+        return device_id.value
+        
+    def get_pan(self):
+        """Return the stereo pan (0.0 left to 1.0 right), or None if the device has none"""
+        pan = ctypes.c_float(0.5)
+        size = ctypes.c_uint32(ctypes.sizeof(pan))
+        status = self.lib.AudioObjectGetPropertyData(
+            self.device_id, ctypes.byref(self.pan_address), 0, None, ctypes.byref(size), ctypes.byref(pan))
+        return pan.value if status == 0 else None
+        
+    def set_pan(self, pan):
+        """Set the stereo pan (0.0 left to 1.0 right); returns False on a CoreAudio error"""
+        value = ctypes.c_float(pan)
+        status = self.lib.AudioObjectSetPropertyData(
+            self.device_id, ctypes.byref(self.pan_address), 0, None, ctypes.sizeof(value), ctypes.byref(value))
+        return status == 0
+
 class HeadTrackingAudioBalancer:
     def __init__(self):
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.configure_opencv()
+        self.face_cascade = self.load_face_cascade()
         self.cap = cv2.VideoCapture(0)
+        # 640x480 is plenty for head position and keeps per-frame pixel work low
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        # Keep the driver from queueing stale frames behind the one we want
+        if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+            # Not every backend supports this; the capture thread's continuous
+            # grab() still keeps frames fresh
+            print("Note: Camera backend ignored the frame buffer size setting")
         self.running = True
         self.last_balance_update = time.time()
         self.update_frequency = 0.2  # seconds between balance updates
         self.screen_center_x = None  # Will be set when video capture starts
-        self.show_preview = True  # Toggle this to enable/disable video preview
+        self.show_preview = False  # Toggle with 'p'; the preview and cartoon filter only run while it's on
         
         # Calibration parameters
         self.calibrated = False
@@ -26,15 +127,139 @@ class HeadTrackingAudioBalancer:
         self.sensitivity = 0.8  # Adjust this to change how quickly balance changes with movement
         self.original_system_balance = None
         
+        # Cached (center, 1 / (center * sensitivity)) used by calculate_audio_balance;
+        # recomputed whenever calibration or sensitivity changes
+        self.frame_width = None  # Will be set when video capture starts
+        self.balance_norm = None
+        
         # Audio balance mode
         self.use_eqmac = True  # Set to True to use eqMac, False to use system audio
         
-        # Last detected face position
+        # Balance updates are sent by a worker thread; the queue holds only the newest one
+        self.balance_q = queue.Queue(maxsize=1)
+        self.last_queued_balance = None
+        self.last_sent_balance = None
+        self.audio_thread = None
+        self.balance_script_path = None  # Compiled on first system balance update
+        self.balance_script_dir = None
+        
+        # Set the system balance in-process through CoreAudio when possible;
+        # AppleScript is only the fallback
+        try:
+            self.coreaudio = CoreAudioBalance()
+        except OSError as e:
+            print(f"CoreAudio unavailable, using AppleScript for system balance: {e}")
+            self.coreaudio = None
+        
+        # Last detected face position and the balance computed from it
         self.last_face_position = None
+        self.current_balance = 0.0  # Smoothed with an exponential moving average
+        self.balance_smoothing = 0.3  # Weight of each new measurement
+        self.balance_deadband = 0.02  # Minimum change before the audio balance is updated
+        self.last_pushed_balance = None
         
         # Cartoon filter parameters
         self.use_cartoon_filter = True
         
+        # Per-frame image buffers, reused every frame (allocated once capture starts)
+        self.gray_buffer = None
+        self.blurred_buffer = None
+        self.mean_buffer = None
+        self.shifted_buffer = None
+        self.edges_buffer = None
+        self.edges_bgr_buffer = None
+        self.color_buffer = None
+        self.cartoon_buffer = None
+        self.smooth_size = None
+        self.smooth_buffer = None
+        self.smoothed_buffer = None
+        
+        # Run the cartoon filter through OpenCV's OpenCL (T-API) path when a device exists
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        cv2.ocl.setUseOpenCL(self.use_opencl)
+        
+        # Face detection runs on a downscaled copy of the frame this wide (pixels)
+        self.detection_width = 320
+        self.detection_scale = None  # Will be set when video capture starts
+        self.detection_size = None
+        self.small_buffer = None
+        
+        # Run face detection only on every Nth frame and reuse the last face in between
+        self.frame_idx = 0
+        self.detect_every = 2
+        self.last_face_rect = None  # (x, y, w, h) of the last detected face
+        
+        # When detection can't keep up with the camera, detect less often (up to
+        # every max_detect_every frames) and recover once there is headroom again
+        self.base_detect_every = self.detect_every
+        self.max_detect_every = 8
+        self.frame_period = 1 / 30  # Will be set from the camera when capture starts
+        self.detection_time = 0.0  # Moving average of one detect_largest_face call
+        self.detection_count = 0
+        
+        # Restrict detection to the area and size range around the previous face,
+        # falling back to a full-frame search after this many misses in a row
+        self.search_rect = None
+        self.missed_detections = 0
+        self.max_missed_detections = 3
+        
+        # Skip detection while a tiny copy of the frame barely differs (mean absolute
+        # difference, 0-255) from the one at the last detection
+        self.motion_size = (80, 60)
+        self.motion_threshold = 2.0
+        self.motion_buffer = None
+        self.motion_reference = None
+        
+        # Capture runs on its own thread and hands the newest frame to the tracking
+        # loop through a single-slot queue; frame buffers are recycled via free_frames
+        self.frame_q = queue.Queue(maxsize=1)
+        self.free_frames = queue.Queue()
+        self.capture_thread = None
+        
+        # Preview frames go to the main thread through a single-slot queue; its
+        # buffers are recycled via free_previews (free_gpu_previews for UMat frames),
+        # and key presses come back as commands
+        self.display_q = queue.Queue(maxsize=1)
+        self.free_previews = queue.Queue()
+        self.free_gpu_previews = queue.Queue()
+        self.command_q = queue.Queue()
+        self.preview_open = False  # Whether the main thread has the window open
+        
+    def configure_opencv(self):
+        """Enable OpenCV's optimized kernels and size its worker pool for a small frame"""
+        cv2.setUseOptimized(True)
+        # Half the logical cores leaves room for the capture, audio and GUI threads
+        cv2.setNumThreads(max(1, (os.cpu_count() or 2) // 2))
+        
+        # Wheels built without SIMD dispatch run the cascade and filters much slower
+        build_info = cv2.getBuildInformation()
+        if 'AVX2' not in build_info and 'NEON' not in build_info:
+            print("Warning: This OpenCV build has no AVX2/NEON support; "
+                  "consider installing a build (e.g. opencv-contrib-python) with SIMD enabled")
+        
+    def load_face_cascade(self):
+        """Load the fastest available frontal face cascade"""
+        # The LBP cascade is 2-3x faster than Haar at comparable recall, but not every
+        # OpenCV build ships it, so fall back to the smaller alt2 Haar cascade and
+        # finally the default one
+        candidates = [
+            cv2.data.haarcascades + 'lbpcascade_frontalface_improved.xml',
+            cv2.data.haarcascades + '../lbpcascades/lbpcascade_frontalface_improved.xml',
+            cv2.data.haarcascades + 'haarcascade_frontalface_alt2.xml',
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml',
+        ]
+        for path in candidates:
+            # Check first; OpenCV logs an error for every file it can't open
+            if not os.path.exists(path):
+                continue
+            cascade = cv2.CascadeClassifier(path)
+            if not cascade.empty():
+                print(f"Using face cascade: {os.path.basename(path)}")
+                return cascade
+        
+        print("Error: Could not load a face cascade.")
+        return cv2.CascadeClassifier()
+        
     def get_screen_dimensions(self):
         # Get screen width from system_profiler
         try:
@@ -66,6 +291,11 @@ class HeadTrackingAudioBalancer:
             # since we don't have a direct way to query eqMac's balance via script
             return 50
             
+        if self.coreaudio is not None:
+            pan = self.coreaudio.get_pan()
+            if pan is not None:
+                return int(round(pan * 100))
+            
         # System audio balance via AppleScript
         applescript = '''
         tell application "System Events"
@@ -86,49 +316,131 @@ class HeadTrackingAudioBalancer:
             print(f"Error getting system balance: {e}")
             return 50  # Default to center
 
-    def calculate_audio_balance(self, face_x, frame_width):
+    def update_balance_normalization(self, frame_width=None):
+        """Cache the balance center and the reciprocal of its normalization"""
+        if frame_width is not None:
+            self.frame_width = frame_width
+        
         # If calibrated, use the calibration position as the center
         if self.calibrated and self.calibration_center_x is not None:
-            center_position = self.calibration_center_x
+            center_position = float(self.calibration_center_x)
+        elif self.frame_width is not None:
+            center_position = self.frame_width / 2
         else:
-            center_position = frame_width / 2
-        
-        # Calculate how far off-center the face is
-        offset = face_x - center_position
-        
-        # Convert to a -1 to 1 range (normalized by half the frame width)
-        balance = offset / (center_position * self.sensitivity)
+            return
         
-        # Clamp the value to stay within -1 to 1
-        balance = max(-1.0, min(1.0, balance))
+        # Assigned as one tuple so the tracking thread never sees a half-updated pair
+        self.balance_norm = (center_position, 1.0 / (center_position * self.sensitivity))
+
+    def calculate_audio_balance(self, face_x, frame_width):
+        if self.balance_norm is None:
+            self.update_balance_normalization(frame_width)
         
-        # Invert the balance since we want sound to be stronger on the side the user is on
-        return -balance
+        center_position, inv_norm = self.balance_norm
+        return _calc_balance(float(face_x), center_position, inv_norm)
 
     def set_audio_balance(self, balance):
         # Balance ranges from -1.0 (full left) to 1.0 (full right)
         balance_percentage = int((balance + 1) * 50)  # Convert to 0-100 scale
         
+        # Small head movements usually land on the same percentage; nothing to do then
+        if balance_percentage == self.last_queued_balance:
+            return
+        self.last_queued_balance = balance_percentage
+        
+        # Hand the value to the audio thread so osascript never blocks tracking;
+        # only the newest value matters, so replace one that hasn't been sent yet
+        try:
+            self.balance_q.put_nowait(balance_percentage)
+        except queue.Full:
+            try:
+                self.balance_q.get_nowait()
+            except queue.Empty:
+                pass
+            self.balance_q.put_nowait(balance_percentage)
+
+    def send_audio_balance(self, balance_percentage):
+        """Apply a 0-100 balance immediately, skipping values that were already sent"""
+        if balance_percentage == self.last_sent_balance:
+            return
+        
         if self.use_eqmac:
             self.set_eqmac_balance(balance_percentage)
         else:
             self.set_system_balance(balance_percentage)
+        self.last_sent_balance = balance_percentage
 
-    def set_system_balance(self, balance_percentage):
-        """Set system audio balance via AppleScript (0-100)"""
-        applescript = f'''
-        tell application "System Events"
-            tell application process "SystemUIServer"
-                set theVolume to first slider of group 1 of menu bar item 1 of menu bar 1
-                tell theVolume
-                    set balance to {balance_percentage}
+    def audio_balance_worker(self):
+        """Send queued balance updates to the audio backend off the tracking thread"""
+        while self.running:
+            try:
+                balance_percentage = self.balance_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.send_audio_balance(balance_percentage)
+
+    def compile_balance_script(self):
+        """Compile the system balance AppleScript once so each update skips recompiling"""
+        applescript = '''
+        on run argv
+            set balancePercentage to (item 1 of argv) as integer
+            tell application "System Events"
+                tell application process "SystemUIServer"
+                    set theVolume to first slider of group 1 of menu bar item 1 of menu bar 1
+                    tell theVolume
+                        set balance to balancePercentage
+                    end tell
                 end tell
             end tell
-        end tell
+        end run
         '''
         
+        # Compile into a private (0700) directory so no other user can swap the
+        # script out before osascript runs it
+        try:
+            self.balance_script_dir = tempfile.mkdtemp(prefix='veklo-')
+            script_path = os.path.join(self.balance_script_dir, 'set_balance.scpt')
+            result = subprocess.run(['osacompile', '-o', script_path, '-e', applescript], capture_output=True)
+            if result.returncode == 0:
+                return script_path
+            print(f"Error compiling balance script: {result.stderr.decode().strip()}")
+        except Exception as e:
+            print(f"Error compiling balance script: {e}")
+        self.remove_balance_script()
+        return None
+
+    def remove_balance_script(self):
+        """Delete the compiled balance script and its private directory"""
+        if self.balance_script_dir is not None:
+            shutil.rmtree(self.balance_script_dir, ignore_errors=True)
+            self.balance_script_dir = None
+
+    def set_system_balance(self, balance_percentage):
+        """Set system audio balance via CoreAudio, or AppleScript if that fails (0-100)"""
+        if self.coreaudio is not None and self.coreaudio.set_pan(balance_percentage / 100.0):
+            return
+        
+        if self.balance_script_path is None:
+            self.balance_script_path = self.compile_balance_script() or ''
+        
+        if self.balance_script_path:
+            command = ['osascript', self.balance_script_path, str(balance_percentage)]
+        else:
+            # Compiling failed; fall back to passing the source on every call
+            applescript = f'''
+            tell application "System Events"
+                tell application process "SystemUIServer"
+                    set theVolume to first slider of group 1 of menu bar item 1 of menu bar 1
+                    tell theVolume
+                        set balance to {balance_percentage}
+                    end tell
+                end tell
+            end tell
+            '''
+            command = ['osascript', '-e', applescript]
+        
         try:
-            subprocess.run(['osascript', '-e', applescript], capture_output=True)
+            subprocess.run(command, capture_output=True)
         except Exception as e:
             print(f"Error setting system audio balance: {e}")
 
@@ -178,6 +490,7 @@ class HeadTrackingAudioBalancer:
                 
         self.calibration_center_x = face_x
         self.calibrated = True
+        self.update_balance_normalization()
         print(f"Calibrated: Sweet spot set at position {face_x}")
         
         # Store the original system balance in case we want to restore it later
@@ -188,37 +501,194 @@ class HeadTrackingAudioBalancer:
         self.sensitivity = max(0.2, min(2.0, self.sensitivity + increment))
         if self.sensitivity > 1.9 and increment > 0:
             self.sensitivity = 0.2  # Loop back to lowest setting
+        self.update_balance_normalization()
         print(f"Sensitivity adjusted to {self.sensitivity:.1f}")
 
     def toggle_audio_mode(self):
         """Toggle between eqMac and system audio"""
         self.use_eqmac = not self.use_eqmac
+        # The new backend hasn't been sent anything yet
+        self.last_queued_balance = None
+        self.last_sent_balance = None
         print(f"Audio balance mode switched to: {'eqMac' if self.use_eqmac else 'System Audio'}")
         
+    def toggle_preview(self):
+        """Toggle the video preview window on/off"""
+        self.show_preview = not self.show_preview
+        print(f"Video preview: {'ON' if self.show_preview else 'OFF'}")
+        
     def toggle_cartoon_filter(self):
         """Toggle cartoon filter on/off"""
         self.use_cartoon_filter = not self.use_cartoon_filter
         print(f"Cartoon filter: {'ON' if self.use_cartoon_filter else 'OFF'}")
         
     def apply_cartoon_effect(self, img):
-        """Apply a cartoon-like effect to the image"""
-        # Convert image to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        """Apply a cartoon-like effect to the image, returning it with the grayscale input"""
+        # Convert image to grayscale (kept unblurred so face detection can reuse it)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self.gray_buffer)
+        
+        # With UMat inputs OpenCV dispatches the filters below to OpenCL (GPU)
+        if self.use_opencl:
+            img_src, gray_src = cv2.UMat(img), cv2.UMat(gray)
+        else:
+            img_src, gray_src = img, gray
         
         # Apply median blur
-        gray = cv2.medianBlur(gray, 5)
+        blurred = cv2.medianBlur(gray_src, 5, dst=self.blurred_buffer)
         
-        # Detect edges
-        edges = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, 
-                                     cv2.THRESH_BINARY, 9, 9)
+        # Detect edges: the same test as adaptiveThreshold(MEAN_C, THRESH_BINARY, 9, 9),
+        # pixel + 9 > local 9x9 mean, built from ops that also have OpenCL kernels
+        # (adaptiveThreshold itself is CPU-only)
+        local_mean = cv2.boxFilter(blurred, -1, (9, 9), dst=self.mean_buffer,
+                                   borderType=cv2.BORDER_REPLICATE)
+        shifted = cv2.add(blurred, 9, dst=self.shifted_buffer)
+        edges = cv2.compare(shifted, local_mean, cv2.CMP_GT, dst=self.edges_buffer)
         
-        # Convert back to color for bilateral filter
-        color = cv2.bilateralFilter(img, 9, 300, 300)
+        # Smooth the colors with a bilateral filter on a half-size copy; d=5 there
+        # covers about the same area as d=9 at full size for a fraction of the cost
+        small = cv2.resize(img_src, self.smooth_size, dst=self.smooth_buffer, interpolation=cv2.INTER_AREA)
+        smoothed = cv2.bilateralFilter(small, 5, 300, 300, dst=self.smoothed_buffer)
+        color = cv2.resize(smoothed, (img.shape[1], img.shape[0]), dst=self.color_buffer,
+                           interpolation=cv2.INTER_LINEAR)
         
         # Combine edges with color image
-        cartoon = cv2.bitwise_and(color, color, mask=edges)
+        edges_bgr = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR, dst=self.edges_bgr_buffer)
+        cartoon = cv2.bitwise_and(color, edges_bgr, dst=self.cartoon_buffer)
         
-        return cartoon
+        # With OpenCL the result stays a UMat; drawing, the preview copy and imshow
+        # all accept it, so it is only downloaded when the window shows it
+        return cartoon, gray
+
+    def adapt_detection_rate(self, detection_time):
+        """Detect less often while detection is too slow for the camera, and recover after"""
+        # Only the cascade is timed here: preview work is optional and must not
+        # make tracking less responsive
+        self.detection_time = 0.9 * self.detection_time + 0.1 * detection_time
+        self.detection_count += 1
+        
+        # Only reconsider every few detections so the rate doesn't oscillate
+        if self.detection_count % 8 != 0:
+            return
+        
+        # Detection may use half of each frame's budget, averaged over the frames
+        # it covers; halve the interval only if it would then use under a quarter
+        budget = self.frame_period / 2
+        if self.detection_time / self.detect_every > budget:
+            self.detect_every = min(self.max_detect_every, self.detect_every * 2)
+        elif self.detection_time / (self.detect_every // 2 or 1) < budget / 2:
+            self.detect_every = max(self.base_detect_every, self.detect_every // 2)
+
+    def frame_changed(self, gray):
+        """Whether the frame differs enough from the one at the last detection to look again"""
+        motion = cv2.resize(gray, self.motion_size, dst=self.motion_buffer, interpolation=cv2.INTER_AREA)
+        
+        # Compare against the last detected frame rather than the previous one, so
+        # slow drift still adds up to a new detection
+        if self.last_face_rect is not None and self.motion_reference is not None:
+            mean_difference = cv2.norm(motion, self.motion_reference, cv2.NORM_L1) / motion.size
+            if mean_difference < self.motion_threshold:
+                return False
+        
+        # This frame becomes the new reference; reuse the old one as the next buffer
+        self.motion_buffer, self.motion_reference = self.motion_reference, motion
+        return True
+
+    def detect_largest_face(self, gray):
+        """Return (x, y, w, h) of the largest face in the grayscale frame, or None"""
+        scale = self.detection_scale
+        origin_x, origin_y = 0, 0
+        
+        # Detect faces on a downscaled copy; cascade cost scales with pixel count
+        if self.search_rect is not None:
+            # Search a region three face-widths wide around the previous face,
+            # only at pyramid levels within 25% of its size
+            x, y, w, h = self.search_rect
+            origin_x, origin_y = max(0, x - w), max(0, y - h)
+            region = gray[origin_y:y + 2 * h, origin_x:x + 2 * w]
+            # The region size varies, so its downscaled copy can't use a fixed buffer
+            small = cv2.resize(region, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            small_w, small_h = w * scale, h * scale
+            search_params = {
+                'scaleFactor': 1.2,
+                'minSize': (int(small_w * 0.75), int(small_h * 0.75)),
+                'maxSize': (int(small_w * 1.25) + 1, int(small_h * 1.25) + 1),
+            }
+        else:
+            small = cv2.resize(gray, self.detection_size, dst=self.small_buffer, interpolation=cv2.INTER_AREA)
+            search_params = {'scaleFactor': 1.2, 'minSize': (20, 20)}
+        
+        faces = self.face_cascade.detectMultiScale(small, minNeighbors=5, **search_params)
+        
+        if len(faces) == 0:
+            if self.search_rect is not None:
+                self.missed_detections += 1
+                if self.missed_detections >= self.max_missed_detections:
+                    # Lost the face; go back to searching the whole frame
+                    self.search_rect = None
+            return None
+        
+        # Map the detections back to full-resolution frame coordinates
+        faces = (faces / scale).astype(int)
+        faces[:, 0] += origin_x
+        faces[:, 1] += origin_y
+        
+        # Find the largest face (one vectorized pass over the (N, 4) array)
+        areas = faces[:, 2] * faces[:, 3]
+        largest_face = faces[int(np.argmax(areas))]
+        
+        self.search_rect = largest_face
+        self.missed_detections = 0
+        return largest_face
+
+    def allocate_frame_buffers(self, frame_width, frame_height):
+        """Allocate the per-frame image buffers once so the loop doesn't allocate"""
+        self.gray_buffer = np.empty((frame_height, frame_width), dtype=np.uint8)
+        self.detection_size = (int(round(frame_width * self.detection_scale)),
+                               int(round(frame_height * self.detection_scale)))
+        self.small_buffer = np.empty(self.detection_size[::-1], dtype=np.uint8)
+        motion_width, motion_height = self.motion_size
+        self.motion_buffer = np.empty((motion_height, motion_width), dtype=np.uint8)
+        
+        # The cartoon filter buffers live on the GPU when OpenCL is in use
+        def new_buffer(width, height, channels):
+            if self.use_opencl:
+                return cv2.UMat(height, width, cv2.CV_8UC1 if channels == 1 else cv2.CV_8UC3)
+            shape = (height, width) if channels == 1 else (height, width, channels)
+            return np.empty(shape, dtype=np.uint8)
+        
+        self.blurred_buffer = new_buffer(frame_width, frame_height, 1)
+        self.mean_buffer = new_buffer(frame_width, frame_height, 1)
+        self.shifted_buffer = new_buffer(frame_width, frame_height, 1)
+        self.edges_buffer = new_buffer(frame_width, frame_height, 1)
+        self.edges_bgr_buffer = new_buffer(frame_width, frame_height, 3)
+        self.color_buffer = new_buffer(frame_width, frame_height, 3)
+        self.cartoon_buffer = new_buffer(frame_width, frame_height, 3)
+        
+        # Half-size copies for the bilateral color smoothing
+        self.smooth_size = (max(1, frame_width // 2), max(1, frame_height // 2))
+        self.smooth_buffer = new_buffer(*self.smooth_size, 3)
+        self.smoothed_buffer = new_buffer(*self.smooth_size, 3)
+
+    def prepare_balance_meter(self, frame_width, frame_height):
+        """Compute the balance meter geometry and pre-render its static L/R labels"""
+        meter_x = 50
+        meter_y = frame_height - 50
+        meter_width = frame_width - 100
+        meter_height = 20
+        self.meter_rect = (meter_x, meter_y, meter_width, meter_height)
+        
+        # The labels never change, so draw them once onto a black strip that is
+        # added onto the frame instead of calling putText every frame
+        self.meter_labels_top = max(0, meter_y - 15)
+        labels_bottom = min(frame_height, meter_y + meter_height + 5)
+        self.meter_labels = np.zeros((labels_bottom - self.meter_labels_top, frame_width, 3), dtype=np.uint8)
+        label_y = meter_y + 15 - self.meter_labels_top
+        cv2.putText(self.meter_labels, "L", (meter_x - 20, label_y), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(self.meter_labels, "R", (meter_x + meter_width + 10, label_y), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        # GPU copy for cartoon frames, which stay UMat when OpenCL is in use
+        self.meter_labels_gpu = cv2.UMat(self.meter_labels) if self.use_opencl else None
 
     def track_head(self):
         if not self.cap.isOpened():
@@ -232,6 +702,14 @@ class HeadTrackingAudioBalancer:
             return
         
         frame_height, frame_width = frame.shape[:2]
+        # Never upscale: small cameras are detected at their native resolution
+        self.detection_scale = min(1.0, self.detection_width / frame_width)
+        self.allocate_frame_buffers(frame_width, frame_height)
+        self.prepare_balance_meter(frame_width, frame_height)
+        self.update_balance_normalization(frame_width)
+        camera_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if camera_fps > 0:
+            self.frame_period = 1 / camera_fps
         screen_width, screen_height = self.get_screen_dimensions()
         self.screen_center_x = screen_width / 2
         
@@ -243,6 +721,7 @@ class HeadTrackingAudioBalancer:
         print("  Type 'c' and press Enter to calibrate the current position as the sweet spot")
         print("  Type 's' and press Enter to increase sensitivity (currently {:.1f})".format(self.sensitivity))
         print("  Type 'm' and press Enter to toggle between eqMac and system audio")
+        print("  Type 'p' and press Enter to toggle the video preview")
         print("  Type 'f' and press Enter to toggle cartoon filter")
         print("  Type 'q' and press Enter to quit")
 
@@ -251,47 +730,92 @@ class HeadTrackingAudioBalancer:
         input_thread.daemon = True
         input_thread.start()
 
+        # Pre-allocate enough frame buffers for the queued frame plus the one being
+        # captured and the one being processed, so capture never allocates
+        for _ in range(self.frame_q.maxsize + 2):
+            self.free_frames.put(np.empty_like(frame))
+
+        # Start a separate thread to send audio balance updates
+        self.audio_thread = Thread(target=self.audio_balance_worker)
+        self.audio_thread.daemon = True
+        self.audio_thread.start()
+
+        # Start a separate thread to read frames from the camera
+        self.capture_thread = Thread(target=self.capture_frames)
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+
+        # One preview buffer each for the queue, the main thread and the tracking thread
+        for _ in range(3):
+            self.free_previews.put(np.empty_like(frame))
+            if self.use_opencl:
+                self.free_gpu_previews.put(cv2.UMat(frame_height, frame_width, cv2.CV_8UC3))
+
         try:
             while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    print("Error: Could not read frame.")
+                try:
+                    frame = self.frame_q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    # Capture thread stopped
                     break
+                captured_frame = frame
+                
+                # Run commands from key presses in the preview window
+                while True:
+                    try:
+                        command = self.command_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    self.handle_command(command)
 
                 # Process frame with cartoon filter if enabled
-                if self.use_cartoon_filter:
+                gray = None
+                # The cartoon filter is purely visual, so skip it without a preview
+                if self.use_cartoon_filter and self.show_preview:
                     try:
                         # Apply cartoon effect to the full frame
-                        frame = self.apply_cartoon_effect(frame)
+                        frame, gray = self.apply_cartoon_effect(frame)
                     except Exception as e:
                         print(f"Error applying cartoon filter: {e}")
 
-                # Convert to grayscale for face detection
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                # Only run the cascade every few frames; head position changes slowly
+                # relative to the camera frame rate, so skipped frames reuse the last face
+                self.frame_idx += 1
+                if self.frame_idx % self.detect_every == 0:
+                    # Convert to grayscale for face detection, unless the cartoon filter already did
+                    if gray is None:
+                        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray_buffer)
+                    
+                    # While the scene looks the same as at the last detection, keep that face
+                    if self.frame_changed(gray):
+                        detection_start = time.perf_counter()
+                        self.last_face_rect = self.detect_largest_face(gray)
+                        self.adapt_detection_rate(time.perf_counter() - detection_start)
                 
-                # Detect faces
-                faces = self.face_cascade.detectMultiScale(
-                    gray,
-                    scaleFactor=1.1,
-                    minNeighbors=5,
-                    minSize=(30, 30)
-                )
+                largest_face = self.last_face_rect
                 
                 # Process the largest face if any are detected
-                if len(faces) > 0:
-                    # Find the largest face
-                    largest_face = max(faces, key=lambda x: x[2] * x[3])
+                if largest_face is not None:
                     x, y, w, h = largest_face
                     
                     # Calculate face center position
-                    face_center_x = x + w // 2
+                    face_center_x = x + (w >> 1)
                     self.last_face_position = face_center_x
                     
-                    # Update audio balance (not too frequently)
+                    # Smooth out the few pixels of jitter in the detected face box
+                    balance = self.calculate_audio_balance(face_center_x, frame_width)
+                    balance = (1 - self.balance_smoothing) * self.current_balance + self.balance_smoothing * balance
+                    self.current_balance = balance
+                    
+                    # Update audio balance (not too frequently, and only when it has moved)
                     current_time = time.time()
-                    if current_time - self.last_balance_update > self.update_frequency:
-                        balance = self.calculate_audio_balance(face_center_x, frame_width)
+                    moved = (self.last_pushed_balance is None or
+                             abs(balance - self.last_pushed_balance) >= self.balance_deadband)
+                    if moved and current_time - self.last_balance_update > self.update_frequency:
                         self.set_audio_balance(balance)
+                        self.last_pushed_balance = balance
                         self.last_balance_update = current_time
                         
                         calibration_status = "CALIBRATED" if self.calibrated else "Not calibrated"
@@ -302,7 +826,7 @@ class HeadTrackingAudioBalancer:
                 if self.show_preview:
                     try:
                         # Draw rectangle around the face for visual feedback
-                        if len(faces) > 0:
+                        if largest_face is not None:
                             x, y, w, h = largest_face
                             cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
                             
@@ -319,12 +843,9 @@ class HeadTrackingAudioBalancer:
                                        (0, 255, 0), 1)
                             
                         # Add a balance meter at the bottom of the screen
+                        balance = self.current_balance
                         if self.last_face_position is not None:
-                            balance = self.calculate_audio_balance(self.last_face_position, frame_width)
-                            meter_width = frame_width - 100
-                            meter_x = 50
-                            meter_y = frame_height - 50
-                            meter_height = 20
+                            meter_x, meter_y, meter_width, meter_height = self.meter_rect
                             
                             # Draw the meter background
                             cv2.rectangle(frame, (meter_x, meter_y), 
@@ -337,10 +858,14 @@ class HeadTrackingAudioBalancer:
                                        10, (0, 255, 255), -1)
                             
                             # Add text indicators for left and right
-                            cv2.putText(frame, "L", (meter_x - 20, meter_y + 15), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                            cv2.putText(frame, "R", (meter_x + meter_width + 10, meter_y + 15), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                            labels_top = self.meter_labels_top
+                            labels_bottom = labels_top + self.meter_labels.shape[0]
+                            if isinstance(frame, cv2.UMat):
+                                labels_roi = cv2.UMat(frame, (labels_top, labels_bottom), (0, frame_width))
+                                cv2.add(labels_roi, self.meter_labels_gpu, dst=labels_roi)
+                            else:
+                                labels_roi = frame[labels_top:labels_bottom]
+                                cv2.add(labels_roi, self.meter_labels, dst=labels_roi)
                             
                         # Show status info on screen
                         status_text = f"Balance: {'-' if balance < 0 else '+'}{abs(balance):.2f} | "
@@ -348,79 +873,185 @@ class HeadTrackingAudioBalancer:
                         cv2.putText(frame, status_text, (20, 30), 
                                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
                         
-                        cv2.imshow('Head Tracking Audio Balancer', frame)
-                        
-                        # Check for user input
-                        key = cv2.waitKey(1) & 0xFF
-                        if key == ord('q'):
-                            self.running = False
-                            break
-                        elif key == ord('c') and len(faces) > 0:
-                            # Calibrate to current position
-                            self.calibrate(face_center_x)
-                        elif key == ord('s'):
-                            # Adjust sensitivity
-                            self.adjust_sensitivity()
-                        elif key == ord('m'):
-                            # Toggle between eqMac and system audio
-                            self.toggle_audio_mode()
-                        elif key == ord('f'):
-                            # Toggle cartoon filter
-                            self.toggle_cartoon_filter()
+                        # The main thread owns the window (required by Cocoa on macOS)
+                        self.publish_preview(frame)
                             
                     except Exception as e:
                         print(f"Warning: Could not display video preview: {e}")
                         self.show_preview = False
                         print("Continuing with audio balance adjustment only (no video preview)")
                 
-                # Small sleep to prevent excessive CPU usage
-                time.sleep(0.01)
+                # Hand the buffer back to the capture thread for reuse
+                self.free_frames.put(captured_frame)
                 
         except Exception as e:
             print(f"Error in tracking loop: {e}")
         finally:
             # Cleanup
+            self.running = False
+            if self.capture_thread is not None:
+                self.capture_thread.join(timeout=1.0)
             self.cap.release()
-            if self.show_preview:
-                try:
-                    cv2.destroyAllWindows()
-                except:
-                    pass
             
-            # Reset audio balance to center or original balance
+            # Reset audio balance to center or original balance, directly since
+            # the audio thread has stopped
+            if self.audio_thread is not None:
+                self.audio_thread.join(timeout=1.0)
             if self.original_system_balance is not None:
-                balance_normalized = (self.original_system_balance / 50) - 1
                 print(f"Restoring original system balance: {self.original_system_balance}")
-                self.set_audio_balance(balance_normalized)
+                self.send_audio_balance(self.original_system_balance)
             else:
-                self.set_audio_balance(0)
+                self.send_audio_balance(50)
+            self.remove_balance_script()
             print("Head tracking stopped. Audio balance reset.")
             
+    def publish_frame(self, frame):
+        """Hand a captured frame to the tracking loop, replacing any it hasn't taken"""
+        try:
+            self.frame_q.put_nowait(frame)
+        except queue.Full:
+            # Only this thread fills the queue, so there is room once the stale frame is gone
+            try:
+                stale = self.frame_q.get_nowait()
+                self.free_frames.put(stale)
+            except queue.Empty:
+                pass
+            self.frame_q.put_nowait(frame)
+
+    def capture_frames(self):
+        """Grab camera frames continuously and queue the newest one for tracking"""
+        try:
+            while self.running:
+                # grab() keeps up with the driver so frames never wait in its buffer
+                if not self.cap.grab():
+                    print("Error: Could not read frame.")
+                    break
+                
+                try:
+                    buffer = self.free_frames.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                
+                ret, frame = self.cap.retrieve(buffer)
+                if not ret:
+                    print("Error: Could not decode frame.")
+                    break
+                
+                self.publish_frame(frame)
+        except Exception as e:
+            print(f"Error in capture loop: {e}")
+        finally:
+            # Wake the tracking loop so it notices capture has stopped
+            self.publish_frame(None)
+
+    def handle_command(self, command):
+        """Run a single-letter command from the terminal or the preview window"""
+        if command == 'q':
+            print("Quitting...")
+            self.running = False
+        elif command == 'c':
+            # Calibrate to current position
+            self.calibrate()
+        elif command == 's':
+            # Adjust sensitivity
+            self.adjust_sensitivity()
+        elif command == 'm':
+            # Toggle between eqMac and system audio
+            self.toggle_audio_mode()
+        elif command == 'p':
+            # Toggle video preview
+            self.toggle_preview()
+        elif command == 'f':
+            # Toggle cartoon filter
+            self.toggle_cartoon_filter()
+
+    def preview_pool(self, frame):
+        """Return the free-buffer queue that preview frames like this one belong to"""
+        return self.free_gpu_previews if isinstance(frame, cv2.UMat) else self.free_previews
+
+    def publish_preview(self, frame):
+        """Copy a finished preview frame for the main thread, replacing any it hasn't shown"""
+        try:
+            buffer = self.preview_pool(frame).get_nowait()
+        except queue.Empty:
+            return
+        if isinstance(frame, cv2.UMat):
+            # Device-to-device copy; imshow downloads it on the main thread. OpenCL
+            # queues are per thread and unordered, so wait for the copy to land
+            cv2.copyTo(frame, None, dst=buffer)
+            cv2.ocl.finish()
+        else:
+            np.copyto(buffer, frame)
+        
+        try:
+            self.display_q.put_nowait(buffer)
+        except queue.Full:
+            # Only this thread fills the queue, so there is room once the stale frame is gone
+            try:
+                stale = self.display_q.get_nowait()
+                self.preview_pool(stale).put(stale)
+            except queue.Empty:
+                pass
+            self.display_q.put_nowait(buffer)
+
+    def update_preview(self, timeout=0.1):
+        """Show the newest preview frame and forward key presses; call from the main thread"""
+        if not self.show_preview and self.preview_open:
+            self.close_preview()
+        
+        try:
+            frame = self.display_q.get(timeout=timeout)
+        except queue.Empty:
+            return
+        
+        try:
+            if not self.show_preview:
+                # Preview was switched off after this frame was queued
+                return
+            cv2.imshow('Head Tracking Audio Balancer', frame)
+            self.preview_open = True
+            
+            # Check for user input and hand it to the tracking thread
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                self.running = False
+            elif key != 0xFF:
+                self.command_q.put(chr(key))
+        except Exception as e:
+            print(f"Warning: Could not display video preview: {e}")
+            self.show_preview = False
+            print("Continuing with audio balance adjustment only (no video preview)")
+        finally:
+            self.preview_pool(frame).put(frame)
+
+    def close_preview(self):
+        """Close the preview window; call from the main thread"""
+        self.preview_open = False
+        try:
+            cv2.destroyAllWindows()
+        except:
+            pass
+
     def handle_terminal_input(self):
         """Handle terminal input for commands when GUI is not available"""
         print("Terminal command mode active. Type commands and press Enter.")
         
         while self.running:
             try:
-                # Use a non-blocking read with a timeout to prevent CPU hogging
-                if sys.stdin in select.select([sys.stdin], [], [], 0.1)[0]:
-                    line = sys.stdin.readline().strip().lower()
-                    
-                    if line == 'q':
-                        print("Quitting...")
-                        self.running = False
-                    elif line == 'c':
-                        self.calibrate()
-                    elif line == 's':
-                        self.adjust_sensitivity()
-                    elif line == 'm':
-                        self.toggle_audio_mode()
-                    elif line == 'f':
-                        self.toggle_cartoon_filter()
-                    
-                time.sleep(0.1)  # Sleep to prevent CPU hogging
+                # Wait for input with a timeout; select returns as soon as a line
+                # arrives, and the timeout only bounds how long shutdown takes
+                if sys.stdin in select.select([sys.stdin], [], [], 0.5)[0]:
+                    line = sys.stdin.readline()
+                    if line == '':
+                        # EOF (no terminal attached); select would report stdin
+                        # readable forever, so stop listening
+                        print("Terminal input closed; terminal commands are no longer available.")
+                        return
+                    self.handle_command(line.strip().lower())
             except Exception as e:
+                # Without a sleep a persistent error would spin this loop, so stop here
                 print(f"Error handling terminal input: {e}")
+                return
 
     def start(self):
         tracking_thread = Thread(target=self.track_head)
@@ -431,11 +1062,13 @@ if __name__ == "__main__":
     balancer = HeadTrackingAudioBalancer()
     thread = balancer.start()
     
-    # Keep the main thread running
+    # Keep the main thread running; it also drives the preview window
     try:
         while thread.is_alive():
-            time.sleep(0.1)
+            balancer.update_preview()
     except KeyboardInterrupt:
         print("Stopping head tracking...")
         balancer.running = False
-        thread.join() 
\ No newline at end of file
+        thread.join()
+    finally:
+        balancer.close_preview() 
\ No newline at end of file